@@ -0,0 +1,81 @@
+# batch_runner.py
+"""
+Submit chat completions through Groq's OpenAI-compatible Batch API.
+
+Batched requests cost roughly half the interactive price and don't
+count against interactive rate limits, at the cost of minutes-scale
+turnaround — fine for offline runs of the demos. Only mutually
+independent prompts can be batched; anything that needs an earlier
+phase's output still runs interactively.
+"""
+
+import json
+import time
+from typing import Dict, List
+
+from groq import Groq
+
+from config import GROQ_API_KEY
+
+POLL_INTERVAL_SECONDS = 10
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def build_request(
+    custom_id: str,
+    model: str,
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: int,
+) -> Dict:
+    """Build one batch line in the format Groq's Batch API expects."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": messages,
+        },
+    }
+
+
+def run_batch(requests: List[Dict], completion_window: str = "24h") -> Dict[str, str]:
+    """Submit the requests as one batch, poll until it finishes, and
+    return completion text indexed by custom_id.
+    """
+    if not GROQ_API_KEY:
+        raise RuntimeError("GROQ_API_KEY is not set in .env.")
+    client = Groq(api_key=GROQ_API_KEY)
+
+    jsonl = "\n".join(json.dumps(request) for request in requests)
+    batch_file = client.files.create(
+        file=("batch.jsonl", jsonl.encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=completion_window,
+    )
+    print(f"[batch] Submitted batch {batch.id} ({len(requests)} requests)")
+
+    while batch.status not in TERMINAL_STATUSES:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        batch = client.batches.retrieve(batch.id)
+        print(f"[batch] Status: {batch.status}")
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+
+    results: Dict[str, str] = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        results[record["custom_id"]] = (
+            record["response"]["body"]["choices"][0]["message"]["content"]
+        )
+    return results
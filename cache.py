@@ -0,0 +1,55 @@
+# cache.py
+"""
+Exact-match on-disk cache for Groq chat completions.
+
+Keys are sha256 hashes of the request parameters (model, temperature,
+messages); values are stored as one JSON file per entry under
+~/.cache/autogen_groq/ (override with AGENT_CACHE_DIR). Repeat runs
+with identical prompts skip the network entirely.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+CACHE_DIR = Path(os.getenv("AGENT_CACHE_DIR", "~/.cache/autogen_groq")).expanduser()
+
+
+def make_key(
+    model: str,
+    temperature: float,
+    messages: list,
+    max_tokens: Optional[int] = None,
+    response_format: Optional[dict] = None,
+) -> str:
+    """Build a deterministic cache key for one completion request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached completion text, or None on a miss."""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))["content"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def put(key: str, value: str) -> None:
+    """Store one completion text under the given key."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    (CACHE_DIR / f"{key}.json").write_text(
+        json.dumps({"content": value}), encoding="utf-8"
+    )
@@ -11,17 +11,20 @@ Reads from .env:
 - VERBOSE, DEBUG
 """
 
+import asyncio
+import atexit
+import functools
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from dotenv import load_dotenv
 
 # ---------------------------------------------------------------------
 # Load .env from project root
 # ---------------------------------------------------------------------
-ROOT_DIR = Path(__file__).resolve().parents[1]
+ROOT_DIR = Path(__file__).resolve().parent
 env_path = ROOT_DIR / ".env"
 load_dotenv(env_path)
 
@@ -31,10 +34,48 @@ load_dotenv(env_path)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 # Allow override via env; otherwise use a reasonable default Groq chat model
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+# Stronger model reserved for phases that need real reasoning (review);
+# the instant model is cheaper and faster for the bulk of the workflow
+GROQ_REVIEW_MODEL = os.getenv("GROQ_REVIEW_MODEL", "llama-3.1-70b-versatile")
 
 # Groq's OpenAI-compatible base URL
 GROQ_API_BASE = "https://api.groq.com/openai/v1"
 
+# ---------------------------------------------------------------------
+# Shared Groq client
+# ---------------------------------------------------------------------
+
+
+@functools.lru_cache(maxsize=1)
+def get_groq_client():
+    """Return the process-wide AsyncGroq client.
+
+    Every workflow shares one HTTP/2 connection pool, so loops that
+    construct many workflows don't re-pay transport setup, and the
+    keep-alive connection skips per-phase TLS handshakes.
+    """
+    # Imported lazily so config stays importable where groq isn't needed
+    import httpx
+    from groq import AsyncGroq
+
+    return AsyncGroq(
+        api_key=GROQ_API_KEY,
+        http_client=httpx.AsyncClient(
+            http2=True,
+            timeout=AGENT_TIMEOUT,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        ),
+    )
+
+
+def aclose_groq_client() -> None:
+    """Close the shared client's connection pool, if one was created."""
+    if get_groq_client.cache_info().currsize:
+        asyncio.run(get_groq_client().close())
+
+
+atexit.register(aclose_groq_client)
+
 # ---------------------------------------------------------------------
 # Agent-level config
 # ---------------------------------------------------------------------
@@ -45,10 +86,30 @@ AGENT_TIMEOUT = int(os.getenv("AGENT_TIMEOUT", "300"))
 VERBOSE = os.getenv("VERBOSE", "True").lower() == "true"
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
+# Cache identical completions on disk (see cache.py); near-zero latency
+# and no token cost for repeat prompts during iteration
+AGENT_CACHE = os.getenv("AGENT_CACHE", "True").lower() == "true"
+
+# Upper bound on concurrent Groq requests when a phase fans out into
+# parallel sub-queries (keeps us under Groq's requests-per-minute limits)
+MAX_PARALLEL_AGENTS = int(os.getenv("MAX_PARALLEL_AGENTS", "3"))
+
+# Max tokens of each prior phase output passed along as context; without
+# a cap the review prompt embeds the whole history verbatim
+CTX_TOKEN_BUDGET = int(os.getenv("CTX_TOKEN_BUDGET", "800"))
+
 # ---------------------------------------------------------------------
 # AutoGen-style workflow config (Exercise 4: research paper outline)
 # ---------------------------------------------------------------------
 
+# Independent themes the literature phase fans out into; each sub-query
+# runs concurrently and the drafts are merged by one aggregation call
+LITERATURE_SUBTOPICS: List[str] = [
+    "key methods and system architectures",
+    "applications and empirical findings",
+    "ethics, trust, and human factors",
+]
+
 LITERATURE_AGENT = {
     "name": "LiteratureReviewer",
     "role": "Literature Review Specialist",
@@ -100,27 +161,51 @@ class WorkflowPhase:
     name: str
     description: str
     agent_config: Dict
-
+    # Decode time and billing scale with generated tokens, so each phase
+    # caps output at what it actually needs instead of the global limit
+    max_tokens: int = AGENT_MAX_TOKENS
+    # Set to {"type": "json_object"} to request Groq JSON mode for a
+    # phase whose output is parsed downstream (default prose, since the
+    # phase outputs feed later prompts and the text report as-is)
+    response_format: Optional[Dict] = None
+    # Smallest model that suffices for the phase; bullet expansion and
+    # outlining don't need the reasoning-grade model review uses
+    model: str = GROQ_MODEL
+
+
+# Which prior outputs each phase actually reads; anything else is
+# dropped from the prompt instead of concatenated verbatim
+CONTEXT_DEPENDENCIES: Dict[str, List[str]] = {
+    "literature": [],
+    "gaps": ["literature"],
+    "outline": ["gaps"],
+    "review": ["outline"],
+}
 
 WORKFLOW_PHASES: List[WorkflowPhase] = [
     WorkflowPhase(
         name="literature",
         description="Literature review on the topic",
         agent_config=LITERATURE_AGENT,
+        max_tokens=1200,
     ),
     WorkflowPhase(
         name="gaps",
         description="Analyze research gaps and propose questions",
         agent_config=GAP_AGENT,
+        max_tokens=500,
     ),
     WorkflowPhase(
         name="outline",
         description="Design structured paper outline",
         agent_config=OUTLINE_AGENT,
+        max_tokens=1500,
     ),
     WorkflowPhase(
         name="review",
         description="Critically review and refine the outline",
         agent_config=REVIEW_AGENT,
+        max_tokens=1500,
+        model=GROQ_REVIEW_MODEL,
     ),
 ]
@@ -12,16 +12,22 @@ Agents:
 4. LogisticsAgent       - checks for conflicts & logistical issues
 """
 
+import asyncio
+import re
 from datetime import datetime
 from pathlib import Path
 import os
 import sys
 
-ROOT_DIR = Path(__file__).resolve().parents[1]
-sys.path.insert(0, str(ROOT_DIR / "autogen"))
+# Resolved once at import instead of per run; this module lives at the
+# project root, so its own directory is the root
+PROJECT_ROOT = Path(__file__).resolve().parent
 
 from crewai import Agent, Task, Crew
 
+# config is a sibling module at the project root; no sys.path surgery
+# needed (the old insert pointed import resolution at a directory whose
+# config.py shadowed this one)
 from config import GROQ_API_KEY, GROQ_API_BASE, GROQ_MODEL, VERBOSE
 
 
@@ -166,7 +172,10 @@ def create_logistics_task(logistics_agent: Agent) -> Task:
 # MAIN ORCHESTRATION
 # ============================================================================
 
-def main(conference_theme: str = "AI in Education"):
+async def main_one(
+    conference_theme: str = "AI in Education",
+    out_name: str = "crewai_demo_ex4.txt",
+):
     print("=" * 80)
     print("CrewAI Multi-Agent Conference Agenda Planner (Groq)")
     print("=" * 80)
@@ -202,32 +211,54 @@ def main(conference_theme: str = "AI in Education"):
     )
 
     print("Starting Crew execution...\n")
-    result = crew.kickoff(inputs={"conference_theme": conference_theme})
+    result = await crew.kickoff_async(inputs={"conference_theme": conference_theme})
 
     print("\n" + "=" * 80)
     print("FINAL 3-DAY CONFERENCE AGENDA (SUMMARY)")
     print("=" * 80)
     print(result)
 
-    # 🔽 NEW: write summary to crewai_demo_ex4.txt in project root
-    project_root = Path(__file__).resolve().parents[1]
-    out_path = project_root / "crewai_demo_ex4.txt"
+    # Write summary to the project root (one file per theme)
+    out_path = PROJECT_ROOT / out_name
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("CrewAI Exercise 4 - 3-Day Conference Agenda\n")
-        f.write("=" * 80 + "\n")
-        f.write(f"Conference Theme: {conference_theme}\n")
-        f.write(f"Model (Groq): {GROQ_MODEL}\n")
-        f.write(f"Generated at: {datetime.now()}\n\n")
-        f.write(str(result))
+    parts = [
+        "CrewAI Exercise 4 - 3-Day Conference Agenda",
+        "=" * 80,
+        f"Conference Theme: {conference_theme}",
+        f"Model (Groq): {GROQ_MODEL}",
+        f"Generated at: {datetime.now()}",
+        "",
+        str(result),
+    ]
+    out_path.write_text("\n".join(parts), encoding="utf-8")
 
     print(f"\nSaved conference agenda summary to: {out_path}")
 
 
-if __name__ == "__main__":
-    import sys
+async def main_many(themes: list):
+    """Plan several conference themes concurrently.
+
+    Each theme is an independent crew run, so total wall time is roughly
+    the slowest theme rather than the sum. CREW_MAX_PARALLEL caps how
+    many crews run at once to respect Groq rate limits.
+    """
+    semaphore = asyncio.Semaphore(int(os.getenv("CREW_MAX_PARALLEL", "3")))
+
+    async def plan_theme(theme: str):
+        async with semaphore:
+            slug = re.sub(r"[^a-z0-9]+", "_", theme.lower()).strip("_")
+            await main_one(theme, out_name=f"crewai_demo_ex4_{slug}.txt")
 
-    theme = "AI in Education"
-    if len(sys.argv) > 1:
-        theme = " ".join(sys.argv[1:])
-    main(theme)
+    await asyncio.gather(*[plan_theme(theme) for theme in themes])
+
+
+if __name__ == "__main__":
+    # One theme: python crewai_demo.py AI in Education
+    # Several:   python crewai_demo.py AI in Education "|" Robotics in Healthcare
+    raw = " ".join(sys.argv[1:])
+    themes = [t.strip() for t in raw.split("|") if t.strip()] or ["AI in Education"]
+
+    if len(themes) == 1:
+        asyncio.run(main_one(themes[0]))
+    else:
+        asyncio.run(main_many(themes))